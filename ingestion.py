@@ -5,25 +5,31 @@ Pathway streaming ingestion module.
 
 Responsibilities:
   - Simulate live government budget allocation events using Pathway's
-    demo connector (artificial stream generator), so no static dataset
-    is ever loaded in batch.
+    in-process Python connector (artificial stream generator), so no
+    static dataset is ever loaded in batch.
   - Define the schema for every incoming budget event.
-  - Export a single function `get_budget_stream()` that returns a
-    live Pathway Table ready for downstream transformations.
+  - Export `get_budget_stream()`, which returns a live Pathway Table
+    ready for downstream transformations, and `get_contractor_names()`,
+    the contractor id → name lookup table.
 
 Architecture note:
-  Pathway's `pw.demo.range_stream` / `pw.io.csv` connectors are
-  inherently streaming.  New rows appear continuously; downstream
-  operators react incrementally without re-scanning old data.
+  Pathway's `pw.io.python` connector is inherently streaming.  New rows
+  appear continuously; downstream operators react incrementally without
+  re-scanning old data.
 """
 
-import random
+import sys
 import time
-import threading
-import json
-import os
+import numpy as np
 import pathway as pw
 
+# Optional JIT for the event-generation kernel; plain NumPy otherwise
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 1. Schema definition
 #    Every budget allocation event must conform to this schema.
@@ -34,9 +40,15 @@ class BudgetEventSchema(pw.Schema):
     sector: str         # e.g. "Electricity", "Water", "Transport"
     allocation: float   # INR in crores
     contractor: str     # contractor name
+    contractor_id: int  # dense id from CONTRACTOR_IDS — cheap grouping key
     timestamp: int      # Unix epoch seconds
 
 
+class ContractorNameSchema(pw.Schema):
+    contractor_id: int = pw.column_definition(primary_key=True)
+    contractor: str
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 2. Data generation constants
 # ─────────────────────────────────────────────────────────────────────────────
@@ -59,6 +71,14 @@ CONTRACTORS = [
     "HydroForce Inc", "TerraBuild Associates"
 ]
 
+# Interned so every generated event shares one object per distinct name
+STATES      = [sys.intern(s) for s in STATES]
+SECTORS     = [sys.intern(s) for s in SECTORS]
+CONTRACTORS = [sys.intern(c) for c in CONTRACTORS]
+
+# Dictionary encoding: contractor name → dense integer id
+CONTRACTOR_IDS = {name: i for i, name in enumerate(CONTRACTORS)}
+
 # Base allocation ranges per sector (crores INR)
 BASE_ALLOCATIONS = {
     "Electricity":       (200, 800),
@@ -75,76 +95,141 @@ BASE_ALLOCATIONS = {
 ANOMALY_PROBABILITY = 0.08
 
 
-def _generate_event() -> dict:
-    """Generate a single realistic (or occasionally anomalous) budget event."""
-    state = random.choice(STATES)
-    sector = random.choice(SECTORS)
-    contractor = random.choice(CONTRACTORS)
+# Events are drawn this many at a time so the sampling is amortized
+BATCH_SIZE = 64
+
+# Index-aligned lookup arrays — a sector id selects its name and band
+_STATES_ARR      = np.array(STATES, dtype=object)
+_SECTORS_ARR     = np.array(SECTORS, dtype=object)
+_CONTRACTORS_ARR = np.array(CONTRACTORS, dtype=object)
+_BASE_LO = np.array([BASE_ALLOCATIONS[s][0] for s in SECTORS], dtype=np.float64)
+_BASE_HI = np.array([BASE_ALLOCATIONS[s][1] for s in SECTORS], dtype=np.float64)
+
+_N_STATES      = len(STATES)
+_N_SECTORS     = len(SECTORS)
+_N_CONTRACTORS = len(CONTRACTORS)
+
 
-    lo, hi = BASE_ALLOCATIONS.get(sector, (100, 500))
+if NUMBA_AVAILABLE:
+    # Explicit signature → compiled eagerly at import, so the first
+    # generated batch doesn't pay the JIT cost.
+    @njit(
+        "Tuple((int64[:], int64[:], int64[:], float64[:]))(int64)",
+        cache=True,
+        fastmath=True,
+    )
+    def _draw_batch(n):
+        """Draw (state, sector, contractor) indices and allocations for n events."""
+        state_idx      = np.empty(n, np.int64)
+        sector_idx     = np.empty(n, np.int64)
+        contractor_idx = np.empty(n, np.int64)
+        allocation     = np.empty(n, np.float64)
+        for i in range(n):
+            state_idx[i]      = np.random.randint(0, _N_STATES)
+            sector_idx[i]     = np.random.randint(0, _N_SECTORS)
+            contractor_idx[i] = np.random.randint(0, _N_CONTRACTORS)
+            hi = _BASE_HI[sector_idx[i]]
+            if np.random.random() < ANOMALY_PROBABILITY:
+                # Spike — 5–15× the normal upper bound
+                allocation[i] = np.random.uniform(hi * 5, hi * 15)
+            else:
+                allocation[i] = np.random.uniform(_BASE_LO[sector_idx[i]], hi)
+        return state_idx, sector_idx, contractor_idx, allocation
+
+else:
+    _RNG = np.random.default_rng()
 
-    if random.random() < ANOMALY_PROBABILITY:
+    def _draw_batch(n):
+        """Draw (state, sector, contractor) indices and allocations for n events."""
+        state_idx      = _RNG.integers(0, _N_STATES, n)
+        sector_idx     = _RNG.integers(0, _N_SECTORS, n)
+        contractor_idx = _RNG.integers(0, _N_CONTRACTORS, n)
+
+        lo, hi  = _BASE_LO[sector_idx], _BASE_HI[sector_idx]
+        anomaly = _RNG.random(n) < ANOMALY_PROBABILITY
         # Spike — 5–15× the normal upper bound
-        allocation = random.uniform(hi * 5, hi * 15)
-    else:
-        allocation = random.uniform(lo, hi)
+        allocation = np.where(
+            anomaly,
+            _RNG.uniform(hi * 5, hi * 15),
+            _RNG.uniform(lo, hi),
+        )
+        return state_idx, sector_idx, contractor_idx, allocation
 
-    return {
-        "state":       state,
-        "sector":      sector,
-        "allocation":  round(allocation, 2),
-        "contractor":  contractor,
-        "timestamp":   int(time.time()),
-    }
 
+def _generate_batch(n: int) -> list[dict]:
+    """
+    Generate `n` realistic (or occasionally anomalous) budget events.
+    Numeric draws happen in `_draw_batch`; this wrapper only maps the
+    indices back to names.  Timestamps are stamped at emission time by
+    the connector, not here.
+    """
+    state_idx, sector_idx, contractor_idx, allocation = _draw_batch(n)
 
-# ─────────────────────────────────────────────────────────────────────────────
-# 3. Streaming JSONL writer
-#    Pathway's `pw.io.jsonlines` connector tails a file in real-time,
-#    so we write events to a JSONL file from a background thread and
-#    let Pathway's connector stream them in incrementally.
-# ─────────────────────────────────────────────────────────────────────────────
+    return [
+        {
+            "state":       state,
+            "sector":      sector,
+            "allocation":  alloc,
+            "contractor":     contractor,
+            "contractor_id":  contractor_id,
+        }
+        for state, sector, alloc, contractor, contractor_id in zip(
+            _STATES_ARR[state_idx].tolist(),
+            _SECTORS_ARR[sector_idx].tolist(),
+            np.round(allocation, 2).tolist(),
+            _CONTRACTORS_ARR[contractor_idx].tolist(),
+            contractor_idx.tolist(),
+        )
+    ]
 
-STREAM_FILE = "data/budget_stream.jsonl"
-_writer_started = False
 
+# ─────────────────────────────────────────────────────────────────────────────
+# 3. In-process streaming connector
+#    Events are pushed straight into Pathway as Python dicts via a
+#    ConnectorSubject — no intermediate file, JSON encoding or tailer.
+# ─────────────────────────────────────────────────────────────────────────────
 
-def _start_stream_writer(interval_seconds: float = 1.5):
+class BudgetSubject(pw.io.python.ConnectorSubject):
     """
-    Background thread: continuously appends new budget events to
-    STREAM_FILE.  Pathway's file connector detects the appended lines
-    and emits them as streaming rows — no batch reloading ever occurs.
+    Pathway connector that emits a new budget event every
+    `interval_seconds`.  `run()` is executed by Pathway on its own
+    thread; each `self.next(...)` call becomes one streaming row.
     """
-    global _writer_started
-    if _writer_started:
-        return
-    _writer_started = True
-
-    os.makedirs("data", exist_ok=True)
-    # Seed the file with a few initial rows so the pipeline starts immediately
-    with open(STREAM_FILE, "w") as f:
-        for _ in range(5):
-            f.write(json.dumps(_generate_event()) + "\n")
-
-    def _write_loop():
+
+    def __init__(self, interval_seconds: float = 1.5):
+        super().__init__()
+        self.interval_seconds = interval_seconds
+
+    def _emit(self, event: dict):
+        self.next(**event, timestamp=int(time.time()))
+
+    def run(self):
+        # Seed a few initial rows so the pipeline starts immediately
+        for event in _generate_batch(5):
+            self._emit(event)
+
         while True:
-            time.sleep(interval_seconds)
-            event = _generate_event()
-            with open(STREAM_FILE, "a") as f:
-                f.write(json.dumps(event) + "\n")
+            for event in _generate_batch(BATCH_SIZE):
+                time.sleep(self.interval_seconds)
+                self._emit(event)
+
 
-    t = threading.Thread(target=_write_loop, daemon=True)
-    t.start()
+class ContractorNamesSubject(pw.io.python.ConnectorSubject):
+    """Emit the CONTRACTOR_IDS lookup once, then finish."""
+
+    def run(self):
+        for name, contractor_id in CONTRACTOR_IDS.items():
+            self.next(contractor_id=contractor_id, contractor=name)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 4. Public API — get_budget_stream()
+# 4. Public API — get_budget_stream(), get_contractor_names()
 # ─────────────────────────────────────────────────────────────────────────────
 
 def get_budget_stream() -> pw.Table:
     """
-    Start the background event writer and return a live Pathway Table
-    that streams budget allocation events in real-time.
+    Return a live Pathway Table that streams budget allocation events
+    in real-time from the in-process BudgetSubject connector.
 
     Returns
     -------
@@ -153,14 +238,25 @@ def get_budget_stream() -> pw.Table:
         All downstream operators (in transformations.py) react
         incrementally to each new row.
     """
-    _start_stream_writer(interval_seconds=1.5)
-
-    # pw.io.jsonlines tails STREAM_FILE; every new line becomes a new
-    # streaming row — this is Pathway's native streaming connector.
-    budget_table = pw.io.jsonlines.read(
-        STREAM_FILE,
+    # pw.io.python.read consumes rows pushed by BudgetSubject; the
+    # connector is inherently streaming — nothing is ever batch-reloaded.
+    budget_table = pw.io.python.read(
+        BudgetSubject(interval_seconds=1.5),
         schema=BudgetEventSchema,
-        mode="streaming",          # Pathway key: never batch-reload
     )
 
     return budget_table
+
+
+def get_contractor_names() -> pw.Table:
+    """
+    Return the static contractor lookup table.
+
+    Returns
+    -------
+    pw.Table  — schema: ContractorNameSchema
+        One row per contractor, keyed by `contractor_id`.  Downstream
+        operators group on the integer id and join back to this table
+        only when the name is needed for output.
+    """
+    return pw.io.python.read(ContractorNamesSubject(), schema=ContractorNameSchema)
@@ -15,46 +15,91 @@ Open http://localhost:8000/docs for the auto-generated Swagger UI.
 """
 
 import os
-import json
+import sys
 import time
+import heapq
 import asyncio
+import itertools
 import threading
 import uvicorn
 from contextlib import asynccontextmanager
+from html import escape
 from typing import Optional
 
 import pathway as pw
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from ingestion        import get_budget_stream
+from ingestion        import get_budget_stream, get_contractor_names
 from transformations  import transform_budget
 from rag_layer        import (
     build_document_store,
     build_rag_answerer,
     query_budget_ai,
+    query_budget_ai_stream,
     update_live_context,
+    warmup_rag,
 )
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Output directories
 # ─────────────────────────────────────────────────────────────────────────────
-os.makedirs("output", exist_ok=True)
+# JSONL audit sinks are off by default — FastAPI is fed by subscribe
+# callbacks, so on-disk output is only needed for forensic audit runs.
+AUDIT_TO_DISK = os.getenv("MAYA_WRITE_JSONL_AUDIT", "0") == "1"
+
+if AUDIT_TO_DISK:
+    os.makedirs("output", exist_ok=True)
 os.makedirs("data",   exist_ok=True)
 
 # ─────────────────────────────────────────────────────────────────────────────
 # Global state — populated by Pathway output callbacks
 # ─────────────────────────────────────────────────────────────────────────────
+# Each table is mirrored as {pathway key → row}, kept in arrival order.
 _state = {
-    "spike_alerts":        [],
-    "contractor_flags":    [],
-    "state_sector_agg":    [],
+    "spike_alerts":        {},
+    "contractor_flags":    {},
+    "state_sector_agg":    {},
     "last_updated":        None,
+    # Derived views, refreshed by the subscribe callbacks
+    "_agg_top15_html":     [],   # pre-rendered <tr> rows, largest first
+    "_rows_html": {              # table → {key → pre-rendered <tr> row}
+        "spike_alerts":        {},
+        "contractor_flags":    {},
+        "state_sector_agg":    {},
+    },
+    "_by_state":           {},   # state.lower()  → {key → agg row}
+    "_by_sector":          {},   # sector.lower() → {key → agg row}
+    "_summary":            {},   # "state / sector" → totals for RAG context
 }
 _state_lock = threading.Lock()
 
-_rag_answerer = None   # set after Pathway pipeline starts
+# Alert tables keep at most this many rows; the oldest are evicted first
+MAX_ALERT_ROWS = 10_000
+_BOUNDED_TABLES = ("spike_alerts", "contractor_flags")
+
+# Low-cardinality string columns shared across many rows
+_INTERNED_COLUMNS = ("state", "sector", "contractor")
+
+# Human-readable alert text is built here, as rows leave the engine, so
+# the Pathway graph only carries primitive columns.
+_ALERT_REASONS = {
+    "spike_alerts": lambda r: (
+        f"⚠ SPIKE: {r['state']} / {r['sector']} — "
+        f"{r['spike_ratio']:.1f}× above sector average"
+    ),
+    "contractor_flags": lambda r: (
+        f"🚨 CONTRACTOR FLAG: {r['contractor']} — "
+        f"₹{r['total_spend']:,.0f} Cr across {r['payment_count']} payments"
+    ),
+}
+
+_rag_answerer = None   # set by _run_pathway() before pw.run()
+
+# Set once the Pathway graph is built, just before pw.run() blocks
+_pathway_ready = threading.Event()
+PATHWAY_READY_TIMEOUT_S = 10
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -67,111 +112,224 @@ def build_pipeline():
     This function configures the graph; pw.run() starts execution.
     """
     # ── Ingestion ─────────────────────────────────────────────────────────
-    budget_stream = get_budget_stream()
+    budget_stream    = get_budget_stream()
+    contractor_names = get_contractor_names()
 
     # ── Transformations ───────────────────────────────────────────────────
-    results = transform_budget(budget_stream)
+    results = transform_budget(budget_stream, contractor_names)
 
     state_sector_agg  = results["state_sector_agg"]
     spike_alerts      = results["spike_alerts"]
     contractor_flags  = results["contractor_flags"]
 
-    # ── Output sinks — write to JSONL so FastAPI can serve them ───────────
-
-    # 1. State-sector rolling aggregations
-    pw.io.jsonlines.write(
-        state_sector_agg.select(
-            pw.this.state,
-            pw.this.sector,
-            pw.this.total_allocation,
-            pw.this.event_count,
-            pw.this.avg_allocation,
-        ),
-        "output/state_sector_agg.jsonl",
-    )
+    # ── Output sinks — on-disk JSONL audit trail ──────────────────────────
+    if AUDIT_TO_DISK:
+        # 1. State-sector rolling aggregations
+        pw.io.jsonlines.write(
+            state_sector_agg.select(
+                pw.this.state,
+                pw.this.sector,
+                pw.this.total_allocation,
+                pw.this.event_count,
+                pw.this.avg_allocation,
+            ),
+            "output/state_sector_agg.jsonl",
+        )
 
-    # 2. Spike alerts
-    pw.io.jsonlines.write(
-        spike_alerts.select(
-            pw.this.state,
-            pw.this.sector,
-            pw.this.allocation,
-            pw.this.contractor,
-            pw.this.timestamp,
-            pw.this.sector_avg,
-            pw.this.spike_ratio,
-            pw.this.alert_reason,
-        ),
-        "output/spike_alerts.jsonl",
-    )
+        # 2. Spike alerts
+        pw.io.jsonlines.write(
+            spike_alerts.select(
+                pw.this.state,
+                pw.this.sector,
+                pw.this.allocation,
+                pw.this.contractor,
+                pw.this.timestamp,
+                pw.this.sector_avg,
+                pw.this.spike_ratio,
+            ),
+            "output/spike_alerts.jsonl",
+        )
 
-    # 3. Contractor anomaly flags
-    pw.io.jsonlines.write(
-        contractor_flags.select(
-            pw.this.contractor,
-            pw.this.total_spend,
-            pw.this.payment_count,
-            pw.this.alert_reason,
-        ),
-        "output/contractor_flags.jsonl",
-    )
+        # 3. Contractor anomaly flags
+        pw.io.jsonlines.write(
+            contractor_flags.select(
+                pw.this.contractor,
+                pw.this.total_spend,
+                pw.this.payment_count,
+            ),
+            "output/contractor_flags.jsonl",
+        )
+
+    # ── Subscriptions — push row deltas straight into in-memory state ─────
+    _subscribe_state(state_sector_agg, "state_sector_agg")
+    _subscribe_state(spike_alerts,     "spike_alerts")
+    _subscribe_state(contractor_flags, "contractor_flags")
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 2. Output file polling — keep in-memory state fresh for FastAPI
+# 2. Subscribe callbacks — keep in-memory state fresh for FastAPI
+#    Pathway hands us only the rows that changed; state updates are O(Δ).
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _read_jsonl(path: str) -> list[dict]:
-    """Read all records from a JSONL file; return empty list if missing."""
-    if not os.path.exists(path):
-        return []
-    records = []
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    try:
-                        records.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        pass
-    except Exception:
-        pass
-    # Deduplicate by converting to set of frozensets (simple approach)
-    seen, unique = set(), []
-    for r in records:
-        key = json.dumps(r, sort_keys=True)
-        if key not in seen:
-            seen.add(key)
-            unique.append(r)
-    return unique
-
-
-def _poll_outputs():
-    """Background thread: refresh in-memory state every 2 s."""
-    while True:
-        time.sleep(2)
-        spikes      = _read_jsonl("output/spike_alerts.jsonl")
-        contractors = _read_jsonl("output/contractor_flags.jsonl")
-        agg         = _read_jsonl("output/state_sector_agg.jsonl")
-
-        # Build summary dict for RAG context enrichment
-        summary = {}
-        for row in agg:
-            key = f"{row.get('state','?')} / {row.get('sector','?')}"
-            summary[key] = {
+def _subscribe_state(table: pw.Table, name: str):
+    """
+    Mirror `table` into `_state[name]` via `pw.io.subscribe`.
+
+    Deltas are buffered per Pathway time and applied together in
+    `on_time_end`, so an update (retraction + addition of the same key)
+    replaces the row in place instead of briefly dropping it.
+    """
+    pending: dict = {}     # key → new row, or None for a pure retraction
+    retracted: set = set() # keys retracted during the current time
+    alert_reason = _ALERT_REASONS.get(name)
+
+    def on_change(key, row, time, is_addition):
+        if is_addition:
+            # Rows arrive from the engine as fresh strings; intern the
+            # low-cardinality names so state and indices share them
+            for column in _INTERNED_COLUMNS:
+                if column in row:
+                    row[column] = sys.intern(row[column])
+            if alert_reason is not None:
+                row["alert_reason"] = alert_reason(row)
+            pending[key] = row
+        else:
+            retracted.add(key)
+            pending.setdefault(key, None)
+
+    def on_time_end(time):
+        _apply_deltas(name, pending, retracted)
+        pending.clear()
+        retracted.clear()
+
+    pw.io.subscribe(table, on_change=on_change, on_time_end=on_time_end)
+
+
+def _apply_deltas(name: str, pending: dict, retracted: set):
+    """
+    Apply one Pathway time's worth of deltas and schedule a RAG context refresh.
+
+    For bounded tables, an update (retraction + addition) of a key that is
+    no longer in state means the row was evicted — it is not re-inserted,
+    since it would otherwise reappear as the newest row.
+    """
+    # Render dashboard rows once per delta, outside the lock
+    render   = _ROW_RENDERERS[name]
+    rendered = {key: render(row) for key, row in pending.items() if row is not None}
+
+    with _state_lock:
+        if name == "state_sector_agg":
+            _index_agg_rows(pending)
+        rows = _state[name]
+        html = _state["_rows_html"][name]
+        for key, row in pending.items():
+            if row is None:
+                rows.pop(key, None)
+                html.pop(key, None)
+            elif name in _BOUNDED_TABLES and key in retracted and key not in rows:
+                continue
+            else:
+                rows[key] = row
+                html[key] = rendered[key]
+        if name in _BOUNDED_TABLES:
+            while len(rows) > MAX_ALERT_ROWS:
+                oldest = next(iter(rows))
+                del rows[oldest]
+                html.pop(oldest, None)
+        if name == "state_sector_agg":
+            top = heapq.nlargest(
+                15, rows.items(), key=lambda kv: kv[1].get("total_allocation", 0)
+            )
+            _state["_agg_top15_html"] = [html[key] for key, _ in top]
+        _state["last_updated"] = time.time()
+
+    _schedule_context_refresh(len(pending))
+
+
+def _index_agg_rows(pending: dict):
+    """
+    Maintain the state → rows and sector → rows indices for
+    /api/aggregations, and the per-(state, sector) summary used as RAG
+    context.  Lowercased keys are computed once per delta.
+    Must be called with `_state_lock` held, before `pending` is applied,
+    so retracted rows can still be looked up.
+    """
+    rows    = _state["state_sector_agg"]
+    summary = _state["_summary"]
+    for key, row in pending.items():
+        current = row if row is not None else rows.get(key)
+        if current is None:
+            continue
+        label = f"{current.get('state','?')} / {current.get('sector','?')}"
+        if row is not None:
+            summary[label] = {
                 "total_allocation": row.get("total_allocation"),
                 "event_count":      row.get("event_count"),
                 "avg_allocation":   row.get("avg_allocation"),
             }
+        else:
+            summary.pop(label, None)
+        for index, column in ((_state["_by_state"], "state"), (_state["_by_sector"], "sector")):
+            name = current.get(column, "").lower()
+            if row is not None:
+                index.setdefault(name, {})[key] = row
+            elif name in index:
+                index[name].pop(key, None)
+                if not index[name]:
+                    del index[name]
+
+
+# ── Batched RAG context refresh ──────────────────────────────────────────────
+# Deltas are coalesced into one update_live_context() call, flushed when
+# either trigger fires first: LIVE_CONTEXT_MAX_DELAY_MS after the first
+# pending delta, or as soon as LIVE_CONTEXT_MAX_ITEMS deltas have piled up.
+# The RAG layer re-renders its prompt context once per flush.
+
+LIVE_CONTEXT_MAX_DELAY_MS = int(os.getenv("LIVE_CONTEXT_MAX_DELAY_MS", "250"))
+LIVE_CONTEXT_MAX_ITEMS    = int(os.getenv("LIVE_CONTEXT_MAX_ITEMS", "100"))
+
+_context_timer: Optional[threading.Timer] = None
+_context_pending_items = 0
+_context_lock = threading.Lock()
+
+
+def _schedule_context_refresh(n_items: int):
+    """Count `n_items` new deltas toward the next live RAG context flush."""
+    global _context_timer, _context_pending_items
+    with _context_lock:
+        _context_pending_items += n_items
+        flush_now = _context_pending_items >= LIVE_CONTEXT_MAX_ITEMS
+        if flush_now:
+            if _context_timer is not None:
+                _context_timer.cancel()
+        elif _context_timer is None:
+            _context_timer = threading.Timer(
+                LIVE_CONTEXT_MAX_DELAY_MS / 1000, _flush_live_context
+            )
+            _context_timer.daemon = True
+            _context_timer.start()
+    if flush_now:
+        _flush_live_context()
+
+
+def _flush_live_context():
+    """Snapshot the current state and hand it to the RAG layer."""
+    global _context_timer, _context_pending_items
+    with _context_lock:
+        _context_timer = None
+        _context_pending_items = 0
+
+    with _state_lock:
+        spikes      = _latest(_state["spike_alerts"], 10)
+        contractors = list(_state["contractor_flags"].values())
+        summary     = dict(_state["_summary"])
 
-        with _state_lock:
-            _state["spike_alerts"]     = spikes
-            _state["contractor_flags"] = contractors
-            _state["state_sector_agg"] = agg
-            _state["last_updated"]     = time.time()
+    update_live_context(spikes, contractors, summary)
 
-        update_live_context(spikes, contractors, summary)
+
+def _latest(rows: dict, n: int) -> list[dict]:
+    """Return the `n` most recently added rows, oldest first."""
+    return list(itertools.islice(reversed(rows.values()), n))[::-1]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -179,8 +337,22 @@ def _poll_outputs():
 # ─────────────────────────────────────────────────────────────────────────────
 
 def _run_pathway():
-    """Run the Pathway streaming engine in a daemon thread."""
+    """
+    Run the Pathway streaming engine in a daemon thread.
+
+    The RAG document store and answerer add tables to the same global
+    graph, so they are built here too — pw.run() only executes what has
+    been declared by the time it is called.
+    """
+    global _rag_answerer
     build_pipeline()
+    try:
+        store         = build_document_store()
+        _rag_answerer = build_rag_answerer(store)
+    except Exception as e:
+        print(f"[RAG] Warning: {e} — RAG queries will be unavailable.")
+        _rag_answerer = None
+    _pathway_ready.set()
     pw.run(monitoring_level=pw.MonitoringLevel.NONE)
 
 
@@ -194,24 +366,21 @@ async def lifespan(app: FastAPI):
     pw_thread = threading.Thread(target=_run_pathway, daemon=True)
     pw_thread.start()
 
-    # Give Pathway a moment to boot
-    await asyncio.sleep(3)
-
-    # Start RAG (can be built without blocking Pathway)
-    global _rag_answerer
-    try:
-        store         = build_document_store()
-        _rag_answerer = build_rag_answerer(store)
-    except Exception as e:
-        print(f"[RAG] Warning: {e} — RAG queries will be unavailable.")
-        _rag_answerer = None
+    # Wait (off the event loop) until the pipeline and RAG graph are built
+    ready = await asyncio.get_running_loop().run_in_executor(
+        None, _pathway_ready.wait, PATHWAY_READY_TIMEOUT_S
+    )
+    if not ready:
+        print(f"[Pathway] Warning: pipeline not ready after {PATHWAY_READY_TIMEOUT_S}s — continuing.")
 
-    # Start output file poller
-    poll_thread = threading.Thread(target=_poll_outputs, daemon=True)
-    poll_thread.start()
+    # Warm on this loop — the pooled OpenAI client is per event loop
+    warmup_task = asyncio.create_task(warmup_rag()) if _rag_answerer else None
 
     yield   # Application runs
 
+    if warmup_task is not None:
+        warmup_task.cancel()
+
 
 app = FastAPI(
     title="🌿 Green Bharat — Real-Time Budget Auditor",
@@ -222,6 +391,7 @@ app = FastAPI(
     ),
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,   # orjson — faster API encoding
 )
 
 
@@ -236,66 +406,11 @@ class QueryResponse(BaseModel):
     timestamp: float
 
 
-# ── Endpoints ────────────────────────────────────────────────────────────────
-
-@app.get("/", response_class=HTMLResponse, tags=["Dashboard"])
-async def dashboard():
-    """Real-time HTML dashboard (refreshes every 3 seconds)."""
-    with _state_lock:
-        spikes      = _state["spike_alerts"][-10:]
-        contractors = _state["contractor_flags"]
-        agg         = _state["state_sector_agg"]
-        updated     = _state["last_updated"]
-
-    updated_str = (
-        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(updated))
-        if updated else "Initializing…"
-    )
-
-    def spike_rows():
-        if not spikes:
-            return "<tr><td colspan='6' style='text-align:center;color:#aaa'>No spikes detected yet — streaming…</td></tr>"
-        return "".join(
-            f"<tr>"
-            f"<td>{s.get('state','')}</td>"
-            f"<td>{s.get('sector','')}</td>"
-            f"<td>₹{s.get('allocation',0):,.0f} Cr</td>"
-            f"<td>{s.get('contractor','')}</td>"
-            f"<td>{s.get('spike_ratio',0):.1f}×</td>"
-            f"<td style='color:#ff6b6b'>{s.get('alert_reason','')}</td>"
-            f"</tr>"
-            for s in spikes
-        )
-
-    def contractor_rows():
-        if not contractors:
-            return "<tr><td colspan='4' style='text-align:center;color:#aaa'>No contractor flags yet</td></tr>"
-        return "".join(
-            f"<tr>"
-            f"<td>{c.get('contractor','')}</td>"
-            f"<td>₹{c.get('total_spend',0):,.0f} Cr</td>"
-            f"<td>{c.get('payment_count',0)}</td>"
-            f"<td style='color:#ff9f43'>{c.get('alert_reason','')}</td>"
-            f"</tr>"
-            for c in contractors
-        )
-
-    def agg_rows():
-        top = sorted(agg, key=lambda x: x.get("total_allocation", 0), reverse=True)[:15]
-        if not top:
-            return "<tr><td colspan='5' style='text-align:center;color:#aaa'>Aggregating…</td></tr>"
-        return "".join(
-            f"<tr>"
-            f"<td>{r.get('state','')}</td>"
-            f"<td>{r.get('sector','')}</td>"
-            f"<td>₹{r.get('total_allocation',0):,.0f} Cr</td>"
-            f"<td>{r.get('event_count',0)}</td>"
-            f"<td>₹{r.get('avg_allocation',0):,.0f} Cr</td>"
-            f"</tr>"
-            for r in top
-        )
+# ── Dashboard template ───────────────────────────────────────────────────────
+# Static skeleton built once at import; dashboard() only fills in the
+# {placeholders} (literal CSS braces are doubled for str.format_map).
 
-    html = f"""<!DOCTYPE html>
+_DASHBOARD_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="UTF-8">
@@ -408,19 +523,19 @@ async def dashboard():
   <div class="stats">
     <div class="stat-card">
       <h3>Allocation Events</h3>
-      <div class="val">{len(agg)}</div>
+      <div class="val">{agg_count}</div>
     </div>
     <div class="stat-card danger">
       <h3>Spike Alerts</h3>
-      <div class="val">{len(spikes)}</div>
+      <div class="val">{spike_count}</div>
     </div>
     <div class="stat-card warn">
       <h3>Flagged Contractors</h3>
-      <div class="val">{len(contractors)}</div>
+      <div class="val">{contractor_count}</div>
     </div>
     <div class="stat-card">
       <h3>States Monitored</h3>
-      <div class="val">{len(set(r.get('state','') for r in agg))}</div>
+      <div class="val">{state_count}</div>
     </div>
   </div>
 
@@ -443,7 +558,7 @@ async def dashboard():
     <thead><tr>
       <th>State</th><th>Sector</th><th>Allocation</th><th>Contractor</th><th>Spike Ratio</th><th>Alert</th>
     </tr></thead>
-    <tbody>{spike_rows()}</tbody>
+    <tbody>{spike_rows}</tbody>
   </table>
 
   <!-- Contractor Flags -->
@@ -452,7 +567,7 @@ async def dashboard():
     <thead><tr>
       <th>Contractor</th><th>Total Spend</th><th>Payments</th><th>Alert</th>
     </tr></thead>
-    <tbody>{contractor_rows()}</tbody>
+    <tbody>{contractor_rows}</tbody>
   </table>
 
   <!-- State-Sector Aggregation -->
@@ -461,7 +576,7 @@ async def dashboard():
     <thead><tr>
       <th>State</th><th>Sector</th><th>Total Allocation</th><th>Events</th><th>Avg per Event</th>
     </tr></thead>
-    <tbody>{agg_rows()}</tbody>
+    <tbody>{agg_rows}</tbody>
   </table>
 </div>
 
@@ -470,7 +585,109 @@ async def dashboard():
 </footer>
 </body>
 </html>"""
-    return HTMLResponse(content=html)
+
+
+# Per-row templates — text fields are html-escaped before formatting.
+# Rows are formatted by the subscribe callbacks, not by dashboard().
+_SPIKE_ROW_TMPL = (
+    "<tr><td>{}</td><td>{}</td><td>₹{:,.0f} Cr</td><td>{}</td>"
+    "<td>{:.1f}×</td><td style='color:#ff6b6b'>{}</td></tr>"
+)
+_CONTRACTOR_ROW_TMPL = (
+    "<tr><td>{}</td><td>₹{:,.0f} Cr</td><td>{}</td>"
+    "<td style='color:#ff9f43'>{}</td></tr>"
+)
+_AGG_ROW_TMPL = (
+    "<tr><td>{}</td><td>{}</td><td>₹{:,.0f} Cr</td><td>{}</td>"
+    "<td>₹{:,.0f} Cr</td></tr>"
+)
+
+
+def _render_spike_row(s: dict) -> str:
+    return _SPIKE_ROW_TMPL.format(
+        escape(s.get('state','')),
+        escape(s.get('sector','')),
+        s.get('allocation',0),
+        escape(s.get('contractor','')),
+        s.get('spike_ratio',0),
+        escape(s.get('alert_reason','')),
+    )
+
+
+def _render_contractor_row(c: dict) -> str:
+    return _CONTRACTOR_ROW_TMPL.format(
+        escape(c.get('contractor','')),
+        c.get('total_spend',0),
+        c.get('payment_count',0),
+        escape(c.get('alert_reason','')),
+    )
+
+
+def _render_agg_row(r: dict) -> str:
+    return _AGG_ROW_TMPL.format(
+        escape(r.get('state','')),
+        escape(r.get('sector','')),
+        r.get('total_allocation',0),
+        r.get('event_count',0),
+        r.get('avg_allocation',0),
+    )
+
+
+# Rows are rendered once when their delta arrives, not on every refresh
+_ROW_RENDERERS = {
+    "spike_alerts":     _render_spike_row,
+    "contractor_flags": _render_contractor_row,
+    "state_sector_agg": _render_agg_row,
+}
+
+
+# ── Endpoints ────────────────────────────────────────────────────────────────
+
+@app.get("/", response_class=HTMLResponse, tags=["Dashboard"])
+async def dashboard():
+    """Real-time HTML dashboard (refreshes every 3 seconds)."""
+    with _state_lock:
+        spike_html      = _latest(_state["_rows_html"]["spike_alerts"], 10)
+        contractor_html = list(_state["_rows_html"]["contractor_flags"].values())
+        agg_html        = _state["_agg_top15_html"]
+        agg_count       = len(_state["state_sector_agg"])
+        state_count     = len(_state["_by_state"])
+        updated         = _state["last_updated"]
+
+    updated_str = (
+        time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(updated))
+        if updated else "Initializing…"
+    )
+
+    def spike_rows():
+        if not spike_html:
+            return "<tr><td colspan='6' style='text-align:center;color:#aaa'>No spikes detected yet — streaming…</td></tr>"
+        return "".join(spike_html)
+
+    def contractor_rows():
+        if not contractor_html:
+            return "<tr><td colspan='4' style='text-align:center;color:#aaa'>No contractor flags yet</td></tr>"
+        return "".join(contractor_html)
+
+    def agg_rows():
+        if not agg_html:
+            return "<tr><td colspan='5' style='text-align:center;color:#aaa'>Aggregating…</td></tr>"
+        return "".join(agg_html)
+
+    ctx = {
+        "updated_str":      updated_str,
+        "agg_count":        agg_count,
+        "spike_count":      len(spike_html),
+        "contractor_count": len(contractor_html),
+        "state_count":      state_count,
+        "spike_rows":       spike_rows(),
+        "contractor_rows":  contractor_rows(),
+        "agg_rows":         agg_rows(),
+    }
+    return HTMLResponse(
+        content=_DASHBOARD_TEMPLATE.format_map(ctx),
+        headers={"Cache-Control": "max-age=2"},
+    )
 
 
 @app.get("/api/status", tags=["Status"])
@@ -488,28 +705,33 @@ async def status():
 
 
 @app.get("/api/spikes", tags=["Anomalies"])
-async def get_spikes(limit: int = 20):
+async def get_spikes(limit: int = Query(20, ge=0)):
     """Return the most recent spike alerts."""
     with _state_lock:
-        return {"data": _state["spike_alerts"][-limit:], "count": len(_state["spike_alerts"])}
+        return {"data": _latest(_state["spike_alerts"], limit), "count": len(_state["spike_alerts"])}
 
 
 @app.get("/api/contractors", tags=["Anomalies"])
 async def get_contractor_flags():
     """Return all flagged contractors."""
     with _state_lock:
-        return {"data": _state["contractor_flags"], "count": len(_state["contractor_flags"])}
+        return {"data": list(_state["contractor_flags"].values()), "count": len(_state["contractor_flags"])}
 
 
 @app.get("/api/aggregations", tags=["Data"])
 async def get_aggregations(state: Optional[str] = None, sector: Optional[str] = None):
     """Return rolling state-sector aggregations, with optional filters."""
     with _state_lock:
-        data = _state["state_sector_agg"]
-    if state:
-        data = [r for r in data if r.get("state", "").lower() == state.lower()]
-    if sector:
-        data = [r for r in data if r.get("sector", "").lower() == sector.lower()]
+        by_state  = _state["_by_state"].get(state.lower(), {}) if state else None
+        by_sector = _state["_by_sector"].get(sector.lower(), {}) if sector else None
+        if by_state is not None and by_sector is not None:
+            data = [r for k, r in by_state.items() if k in by_sector]
+        elif by_state is not None:
+            data = list(by_state.values())
+        elif by_sector is not None:
+            data = list(by_sector.values())
+        else:
+            data = list(_state["state_sector_agg"].values())
     return {"data": data, "count": len(data)}
 
 
@@ -529,7 +751,7 @@ async def ai_query(request: QueryRequest):
             detail="RAG engine not ready — check OPENAI_API_KEY env variable.",
         )
     try:
-        answer = query_budget_ai(request.question, _rag_answerer)
+        answer = await query_budget_ai(request.question, _rag_answerer)
         return QueryResponse(
             question=request.question,
             answer=answer,
@@ -539,6 +761,25 @@ async def ai_query(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/query/stream", tags=["AI Query"])
+async def ai_query_stream(request: QueryRequest):
+    """
+    Same as POST /query, but the answer is streamed as plain text while
+    the LLM generates it — the first words arrive in ~100 ms instead of
+    after the full completion.
+    """
+    if not _rag_answerer:
+        raise HTTPException(
+            status_code=503,
+            detail="RAG engine not ready — check OPENAI_API_KEY env variable.",
+        )
+    try:
+        chunks = await query_budget_ai_stream(request.question, _rag_answerer)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 5. Entry point
 # ─────────────────────────────────────────────────────────────────────────────
@@ -552,9 +793,14 @@ if __name__ == "__main__":
     print("  API Docs  → http://localhost:8000/docs")
     print("━" * 60)
 
+    # Single worker on purpose — Pathway state lives in this process.
+    # uvloop + httptools ship with uvicorn[standard].
     uvicorn.run(
         app,
         host="0.0.0.0",
         port=8000,
-        log_level="info",
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+        access_log=False,          # dashboard refreshes every 3 s per tab
     )
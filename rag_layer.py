@@ -14,21 +14,42 @@ Architecture:
   new question arrives, Pathway retrieves the most relevant chunks and
   sends them with the question to the LLM for context-aware answers.
 
-  The document store also responds to NEW documents arriving at runtime
-  (streaming docs ingestion) — so updated policies are immediately
-  reflected without a service restart.
+  By default the built-in policy set is fed straight from memory.  With
+  POLICY_DOCS_RUNTIME_RELOAD=1 the store instead stream-ingests
+  POLICY_DOCS_DIR and responds to NEW documents arriving at runtime — so
+  updated policies are reflected without a service restart.
 """
 
+import io
 import os
-import json
-from typing import Optional
+import re
+import csv
+import time
+import heapq
+import asyncio
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+from typing import AsyncIterator, Optional
+import numpy as np
 import pathway as pw
 
+# Optional: exact token counts for pre-chunking the policy documents
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
 # Pathway LLM xPack components (lazy/conditional import to prevent crash on missing sub-deps)
 try:
     from pathway.xpacks.llm import embedders, llms, parsers, splitters
     from pathway.xpacks.llm.document_store import DocumentStore
-    from pathway.xpacks.llm.question_answering import BaseRAGQuestionAnswerer
+    from pathway.xpacks.llm.question_answering import BaseRAGQuestionAnswerer, RAGClient
+    from pathway.stdlib.indexing import BruteForceKnnFactory, UsearchKnnFactory
+    import httpx
+    import openai
     XPACK_AVAILABLE = True
 except ImportError as e:
     print(f"[RAG] Warning: LLM xPack dependencies missing ({e}). RAG will be disabled.")
@@ -40,7 +61,8 @@ except ImportError as e:
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 1. Policy / compliance documents
-#    We create these as real files so Pathway can stream-ingest them.
+#    Indexed from memory by default; written out as real files only when
+#    POLICY_DOCS_RUNTIME_RELOAD=1, so Pathway can stream-ingest them.
 # ─────────────────────────────────────────────────────────────────────────────
 
 POLICY_DOCS_DIR = "data/policy_docs"
@@ -130,102 +152,631 @@ Expected AI Capabilities:
 }
 
 
-def _ensure_policy_docs():
-    """Write policy documents to disk if not already present."""
-    os.makedirs(POLICY_DOCS_DIR, exist_ok=True)
+# The built-in policy set is fed to the Document Store straight from
+# POLICY_DOCUMENTS.  Set POLICY_DOCS_RUNTIME_RELOAD=1 to stream from
+# POLICY_DOCS_DIR instead, so files added at runtime are picked up.
+POLICY_DOCS_RUNTIME_RELOAD = os.getenv("POLICY_DOCS_RUNTIME_RELOAD", "0") == "1"
+
+
+# The static documents never change, so they are chunked once at import
+# into fixed 300-token windows with a 50-token overlap and fed to the
+# Document Store pre-split.  (Runtime-reloaded files still go through
+# TokenCountSplitter, which has no overlap and breaks on sentences.)
+POLICY_CHUNK_TOKENS  = 300
+POLICY_CHUNK_OVERLAP = 50
+
+
+def _word_tokens(text: str) -> list[str]:
+    """Words with their trailing whitespace, so joining them is lossless."""
+    return re.findall(r"\S+\s*", text)
+
+
+def _chunk_policy_docs() -> list[tuple[str, dict]]:
+    """
+    Split every built-in document into overlapping token windows.
+    Without tiktoken (or its BPE file, fetched on first use), words stand
+    in for tokens; line breaks and table layout are preserved either way.
+    """
+    encode, decode = _word_tokens, "".join
+    if TIKTOKEN_AVAILABLE:
+        try:
+            encoding = tiktoken.get_encoding("cl100k_base")
+            encode, decode = encoding.encode, encoding.decode
+        except Exception as e:
+            print(f"[RAG] Warning: tiktoken encoding unavailable ({e}) — chunking by words.")
+
+    step = POLICY_CHUNK_TOKENS - POLICY_CHUNK_OVERLAP
+    chunks = []
     for filename, content in POLICY_DOCUMENTS.items():
         path = os.path.join(POLICY_DOCS_DIR, filename)
-        if not os.path.exists(path):
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(content.strip())
+        tokens = encode(content.strip())
+        for i, start in enumerate(range(0, max(len(tokens) - POLICY_CHUNK_OVERLAP, 1), step)):
+            text = decode(tokens[start:start + POLICY_CHUNK_TOKENS]).strip()
+            chunks.append((text, {"path": path, "chunk": i}))
+    return chunks
+
+
+POLICY_CHUNKS: list[tuple[str, dict]] = _chunk_policy_docs()
+
+
+class PolicyDocSchema(pw.Schema):
+    data: str
+    metadata: pw.Json
+
+
+class PolicyDocsSubject(pw.io.python.ConnectorSubject):
+    """Emit each pre-computed policy chunk once, then finish."""
+
+    def run(self):
+        for text, metadata in POLICY_CHUNKS:
+            self.next(data=text, metadata=pw.Json(metadata))
+
+
+# Fingerprint of the built-in document set, recorded in a sidecar file
+# once the documents are on disk so later calls can skip the writes.
+# The sidecar and temp files live next to, not inside, POLICY_DOCS_DIR —
+# everything in that directory is ingested as a policy document.
+_POLICY_DOCS_DIGEST = hashlib.sha256(
+    "\0".join(f"{name}\0{content}" for name, content in POLICY_DOCUMENTS.items())
+    .encode("utf-8")
+).hexdigest()
+_POLICY_STAGING_DIR = os.path.dirname(os.path.normpath(POLICY_DOCS_DIR)) or "."
+_POLICY_MANIFEST    = os.path.join(_POLICY_STAGING_DIR, ".policy_manifest")
+
+_policy_docs_lock = threading.Lock()
+_policy_docs_written = False
+
+
+def _atomic_write(path: str, content: str):
+    """Write via a temp file + os.replace, so readers never see a partial file."""
+    tmp = os.path.join(
+        _POLICY_STAGING_DIR, f".{os.path.basename(path)}.{os.getpid()}.tmp"
+    )
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _ensure_policy_docs():
+    """
+    Write policy documents to disk unless the manifest shows the current
+    set is already there.  Repeat calls in the same process do no I/O.
+    """
+    global _policy_docs_written
+    with _policy_docs_lock:
+        if _policy_docs_written:
+            return
+        try:
+            with open(_POLICY_MANIFEST, encoding="utf-8") as f:
+                up_to_date = f.read().strip() == _POLICY_DOCS_DIGEST
+        except OSError:
+            up_to_date = False
+
+        if not up_to_date:
+            os.makedirs(POLICY_DOCS_DIR, exist_ok=True)
+            for filename, content in POLICY_DOCUMENTS.items():
+                _atomic_write(os.path.join(POLICY_DOCS_DIR, filename), content.strip())
+            _atomic_write(_POLICY_MANIFEST, _POLICY_DOCS_DIGEST)
+        _policy_docs_written = True
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 2. Shared OpenAI client — one pooled, keep-alive connection set per event
+#    loop, reused by the batched embedder and direct LLM calls
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Short default read timeout — right for embeddings.  Chat completions
+# take seconds to generate 600 tokens, so they get RAG_CHAT_TIMEOUT_MS.
+RAG_CLIENT_TIMEOUT_MS = int(os.getenv("RAG_CLIENT_TIMEOUT_MS", "5000"))
+RAG_CHAT_TIMEOUT_MS   = int(os.getenv("RAG_CHAT_TIMEOUT_MS", "60000"))
+RAG_CONN_POOLING = os.getenv("RAG_CONN_POOLING", "1") == "1"
+
+# httpx.AsyncClient is bound to the loop it first runs on, so clients are
+# cached per loop (Pathway's UDF loop vs. FastAPI's request loop).
+_openai_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _openai_client() -> "openai.AsyncOpenAI":
+    """Return the AsyncOpenAI client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _openai_clients.get(loop)
+    if client is None:
+        timeout = httpx.Timeout(RAG_CLIENT_TIMEOUT_MS / 1000, connect=1.0)
+        http_client = None
+        if RAG_CONN_POOLING:
+            http_client = httpx.AsyncClient(
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+            )
+        client = openai.AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY", ""),
+            timeout=timeout,
+            http_client=http_client,
+        )
+        _openai_clients[loop] = client
+    return client
+
+
+def _chat_client() -> "openai.AsyncOpenAI":
+    """The shared client (same pool) with the longer completion timeout."""
+    return _openai_client().with_options(
+        timeout=httpx.Timeout(RAG_CHAT_TIMEOUT_MS / 1000, connect=1.0)
+    )
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 2. Document Store construction using Pathway xPack
+# 3. Caches — memoize answers and embeddings keyed by SHA-256 of the text
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _LRUCache:
+    """
+    Thread-safe LRU keyed by SHA-256 digest, with an optional TTL.
+    Shared by the Pathway embedder thread and FastAPI request threads.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()   # key → (stored_at, value)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if self.ttl_seconds is not None and time.time() - stored_at >= self.ttl_seconds:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: bytes, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# Final answers — keyed on the question and the live-alert version (see
+# _answer_key); the short TTL bounds how stale quoted totals can get
+_answer_cache = _LRUCache(maxsize=512, ttl_seconds=60)
+
+# Text → embedding vector, for both policy chunks and questions
+_embedding_cache = _LRUCache(maxsize=4096)
+
+# One model for documents and questions, so cached vectors are comparable
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# EMBEDDING_DIMENSIONS shortens the text-embedding-3 output (e.g. 384
+# instead of 1536) — a 4× smaller DocumentStore index and cheaper
+# similarity search, at a small recall cost.  Unset keeps the full size.
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS") or 0) or None
+_EMBEDDING_OPTIONS = {"dimensions": EMBEDDING_DIMENSIONS} if EMBEDDING_DIMENSIONS else {}
+
+
+class _SemanticCache:
+    """
+    Answers keyed by question embedding: a lookup hits when a cached
+    question has cosine similarity ≥ `threshold` with the new one, so
+    paraphrased questions reuse an answer.  Rows are stored unit-normalized
+    in a fixed-size float32 ring buffer (FIFO eviction), so a lookup is a
+    single matrix-vector product.  Entries older than `ttl_seconds` never
+    match, since the totals an answer quotes go stale.
+    """
+
+    def __init__(self, maxsize: int = 1024, threshold: float = 0.95, ttl_seconds: float = 60):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self._vectors: Optional[np.ndarray] = None   # (maxsize, dim), lazily sized
+        self._stored_at = np.zeros(maxsize, dtype=np.float64)
+        self._answers: list = [None] * maxsize
+        self._count = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def get(self, vector) -> Optional[str]:
+        q = self._normalize(vector)
+        with self._lock:
+            if self._count == 0 or self._vectors.shape[1] != q.shape[0]:
+                return None
+            scores = self._vectors[:self._count] @ q
+            expired = self._stored_at[:self._count] < time.time() - self.ttl_seconds
+            scores[expired] = -np.inf
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return self._answers[best]
+            return None
+
+    def put(self, vector, answer: str):
+        q = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != q.shape[0]:
+                self._vectors = np.zeros((self.maxsize, q.shape[0]), dtype=np.float32)
+                self._count = self._next = 0
+            self._vectors[self._next] = q
+            self._stored_at[self._next] = time.time()
+            self._answers[self._next] = answer
+            self._next = (self._next + 1) % self.maxsize
+            self._count = min(self._count + 1, self.maxsize)
+
+    def clear(self):
+        with self._lock:
+            self._count = self._next = 0
+            self._answers = [None] * self.maxsize
+
+
+# Near-duplicate questions on the RAG path, which embeds the question anyway
+_semantic_cache = _SemanticCache()
+
+
+async def _embed_texts(texts: list[str]) -> list[np.ndarray]:
+    """
+    Embed `texts`, consulting `_embedding_cache` first; all misses go out
+    in a single embeddings request.
+    """
+    keys = [_LRUCache.key(text or "") for text in texts]
+    vectors = [_embedding_cache.get(key) for key in keys]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        ret = await _openai_client().embeddings.create(
+            input=[texts[i] or "." for i in missing], model=EMBEDDING_MODEL,
+            **_EMBEDDING_OPTIONS,
+        )
+        for i, item in zip(missing, ret.data):
+            vectors[i] = np.array(item.embedding)
+            _embedding_cache.put(keys[i], vectors[i])
+    return vectors
+
+
+async def _embed_query(text: str) -> np.ndarray:
+    """Embed a single question, consulting `_embedding_cache` first."""
+    return (await _embed_texts([text]))[0]
+
+
+if XPACK_AVAILABLE:
+    class CachedOpenAIEmbedder(embedders.OpenAIEmbedder):
+        """
+        OpenAIEmbedder that consults `_embedding_cache` before calling the
+        API, so repeated texts are embedded only once per process.
+        """
+
+        async def __wrapped__(self, input, **kwargs):
+            key = _LRUCache.key(input or "")
+            vector = _embedding_cache.get(key)
+            if vector is None:
+                vector = await self._embed(input, **kwargs)
+                _embedding_cache.put(key, vector)
+            return vector
+
+        async def _embed(self, input, **kwargs):
+            return await super().__wrapped__(input, **kwargs)
+
+
+    class BatchedOpenAIEmbedder(CachedOpenAIEmbedder):
+        """
+        Cached embedder that coalesces cache misses into batched
+        `embeddings.create(input=[...])` calls.  A batch is flushed once
+        `batch_size` texts are waiting or `max_wait_ms` has elapsed since
+        the first one, whichever comes first.
+        """
+
+        def __init__(self, *, batch_size: int = 256, max_wait_ms: int = 50, **kwargs):
+            super().__init__(**kwargs)
+            self.batch_size = batch_size
+            self.max_wait_s = max_wait_ms / 1000
+            # Kept here — depending on the xPack version, OpenAIEmbedder
+            # either pops it from self.kwargs or leaves it there
+            self._api_key = kwargs.get("api_key")
+            # One queue + flusher task per event loop the embedder runs on
+            self._queues: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+            self._flushers: set = set()
+
+        async def _embed(self, input, **kwargs):
+            loop = asyncio.get_running_loop()
+            queue = self._queues.get(loop)
+            if queue is None:
+                queue = self._queues[loop] = asyncio.Queue()
+                flusher = loop.create_task(self._flush_loop(queue))
+                self._flushers.add(flusher)
+                flusher.add_done_callback(self._flushers.discard)
+            future = loop.create_future()
+            await queue.put((input or ".", future))
+            return await future
+
+        async def _flush_loop(self, queue: asyncio.Queue):
+            loop = asyncio.get_running_loop()
+            # api_key is a client option, not an embeddings.create() argument
+            kwargs = {k: v for k, v in self.kwargs.items() if k != "api_key"}
+            # The pooled client, authenticated with this embedder's own key;
+            # retries are left to Pathway's UDF executor
+            options = {"max_retries": 0}
+            if self._api_key:
+                options["api_key"] = self._api_key
+            client = _openai_client().with_options(**options)
+
+            while True:
+                batch = [await queue.get()]
+                deadline = loop.time() + self.max_wait_s
+                while len(batch) < self.batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                try:
+                    ret = await client.embeddings.create(
+                        input=[text for text, _ in batch], **kwargs
+                    )
+                    for (_, future), item in zip(batch, ret.data):
+                        # The caller may have given up (UDF timeout, disconnect)
+                        if not future.done():
+                            future.set_result(np.array(item.embedding))
+                except Exception as e:
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 4. Document Store construction using Pathway xPack
 # ─────────────────────────────────────────────────────────────────────────────
 
 def build_document_store() -> Optional[DocumentStore]:
     """
-    Stream policy documents into Pathway's Document Store (vector DB).
+    Feed policy documents into Pathway's Document Store (vector DB).
     """
     if not XPACK_AVAILABLE:
         return None
 
-    _ensure_policy_docs()
-
-    # Stream-ingest text files from POLICY_DOCS_DIR
-    docs_source = pw.io.fs.read(
-        POLICY_DOCS_DIR,
-        format="binary",
-        mode="streaming",           # Pathway streaming connector
-        with_metadata=True,
-    )
-
-    # Parse raw bytes → text chunks
-    parsed = docs_source.select(
-        text=pw.apply(lambda b: b.decode("utf-8", errors="replace"), docs_source.data),
-        metadata=docs_source._metadata,
-    )
+    if POLICY_DOCS_RUNTIME_RELOAD:
+        _ensure_policy_docs()
+
+        # Stream-ingest text files from POLICY_DOCS_DIR — `data` (bytes) and
+        # `_metadata` are the columns DocumentStore expects; its default
+        # parser decodes the UTF-8
+        docs = pw.io.fs.read(
+            POLICY_DOCS_DIR,
+            format="binary",
+            mode="streaming",           # Pathway streaming connector
+            with_metadata=True,
+        )
 
-    # Split long documents into manageable chunks
-    splitter = splitters.TokenCountSplitter(max_tokens=300)
+        # Split long documents into manageable chunks
+        splitter = splitters.TokenCountSplitter(max_tokens=POLICY_CHUNK_TOKENS)
+    else:
+        # Static policy set — already chunked at import, no splitter operator
+        static_docs = pw.io.python.read(PolicyDocsSubject(), schema=PolicyDocSchema)
+        docs = static_docs.select(data=pw.this.data, _metadata=pw.this.metadata)
+        splitter = None
 
     # Embed using OpenAI text-embedding (or any Pathway-compatible embedder)
     api_key = os.getenv("OPENAI_API_KEY", "")
-    embedder = embedders.OpenAIEmbedder(api_key=api_key)
-
-    store = DocumentStore(
-        docs=parsed,
-        embedder=embedder,
-        splitter=splitter,
+    embedder = BatchedOpenAIEmbedder(
+        api_key=api_key, model=EMBEDDING_MODEL, batch_size=256, max_wait_ms=50,
+        **_EMBEDDING_OPTIONS,
     )
+
+    try:
+        # HNSW approximate index — retrieval stays sub-ms as policy docs grow
+        store = DocumentStore(
+            docs=docs,
+            retriever_factory=UsearchKnnFactory(
+                embedder=embedder,
+                connectivity=16,          # HNSW M
+                expansion_add=200,        # ef_construction
+                expansion_search=64,      # ef_search
+            ),
+            splitter=splitter,
+        )
+    except Exception as e:
+        print(f"[RAG] Warning: HNSW index unavailable ({e}) — using brute-force KNN.")
+        store = DocumentStore(
+            docs=docs,
+            retriever_factory=BruteForceKnnFactory(embedder=embedder),
+            splitter=splitter,
+        )
     return store
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 3. RAG Question Answerer
+# 5. RAG Question Answerer
 # ─────────────────────────────────────────────────────────────────────────────
 
+LLM_MODEL       = "gpt-4o-mini"          # cost-effective for hackathon
+LLM_TEMPERATURE = 0.2
+LLM_MAX_TOKENS  = 600
+
+AUDITOR_SYSTEM_PROMPT = (
+    "You are an expert government budget auditor for India's Green Bharat "
+    "Initiative.  You have access to real-time budget allocation data and "
+    "compliance policy documents.  Answer questions accurately, citing "
+    "specific numbers and policy rules when available.  Flag any anomalies "
+    "or suspicious patterns proactively.  Be concise but thorough."
+)
+
+# The answerer fills {context} with the retrieved policy chunks and
+# {query} with the (live-context enriched) question.
+AUDITOR_PROMPT_TEMPLATE = (
+    AUDITOR_SYSTEM_PROMPT
+    + "\n\nRelevant policy documents:\n{context}\n\n---\n{query}"
+)
+RAG_RESPONSE_DOCS = 4                     # retrieve 4 most relevant chunks
+
+# The answerer runs inside the Pathway graph and is queried over its own
+# loopback REST server (/v2/answer, /v1/retrieve) through RAGClient.
+RAG_SERVER_HOST = "127.0.0.1"
+RAG_SERVER_PORT = int(os.getenv("RAG_SERVER_PORT", "8001"))
+
+_rag_client: Optional["RAGClient"] = None   # set by build_rag_answerer()
+
+
 def build_rag_answerer(store: Optional[DocumentStore]) -> Optional[BaseRAGQuestionAnswerer]:
     """
-    Wrap the DocumentStore in a RAG pipeline backed by an OpenAI LLM.
+    Wrap the DocumentStore in a RAG pipeline backed by an OpenAI LLM, and
+    expose it on the loopback REST server used by query_budget_ai().
+    Must be called before pw.run() — the server is part of the graph.
     """
+    global _rag_client
     if not XPACK_AVAILABLE or store is None:
         return None
 
     api_key = os.getenv("OPENAI_API_KEY", "")
 
     llm_model = llms.OpenAIChat(
-        model="gpt-4o-mini",          # cost-effective for hackathon
+        model=LLM_MODEL,
         api_key=api_key,
-        temperature=0.2,
-        system_message=(
-            "You are an expert government budget auditor for India's Green Bharat "
-            "Initiative.  You have access to real-time budget allocation data and "
-            "compliance policy documents.  Answer questions accurately, citing "
-            "specific numbers and policy rules when available.  Flag any anomalies "
-            "or suspicious patterns proactively.  Be concise but thorough."
-        ),
-        max_tokens=600,
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS,
     )
 
     answerer = BaseRAGQuestionAnswerer(
         llm=llm_model,
         indexer=store,
-        n_response_docs=4,            # retrieve 4 most relevant chunks
+        prompt_template=AUDITOR_PROMPT_TEMPLATE,
+        search_topk=RAG_RESPONSE_DOCS,
     )
+    answerer.build_server(host=RAG_SERVER_HOST, port=RAG_SERVER_PORT)
+    _rag_client = RAGClient(host=RAG_SERVER_HOST, port=RAG_SERVER_PORT)
     return answerer
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# 4. Context injector — enrich LLM queries with live anomaly data
+# 6. Warmup — pay client / TLS / model cold-start before the first user query
+# ─────────────────────────────────────────────────────────────────────────────
+
+RAG_WARMUP = os.getenv("RAG_WARMUP", "1") == "1"
+
+# Frequent auditor questions (the "Expected AI Capabilities" in
+# green_bharat_mandate.txt) — embedded up front into _embedding_cache.
+WARMUP_QUESTIONS = [
+    "Why did Tamil Nadu electricity allocation increase?",
+    "Which contractor shows abnormal patterns?",
+    "Summarize this week's budget changes.",
+    "Is this allocation compliant?",
+]
+
+
+async def warmup_rag():
+    """
+    Warm the shared client and LLM, and seed the embedding cache.
+
+    Scheduled as a task on the FastAPI event loop (see main.lifespan), so
+    the pooled connections it opens are the ones queries later reuse.
+    The LLM call is capped at one token — it only pays the cold start.
+    """
+    if not XPACK_AVAILABLE or not RAG_WARMUP:
+        return
+    try:
+        await asyncio.gather(*(_embed_query(q) for q in WARMUP_QUESTIONS))
+        await _chat("ping", max_tokens=1)
+    except Exception as e:
+        print(f"[RAG] Warning: warmup failed ({e}) — first query will be cold.")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# 7. Context injector — enrich LLM queries with live anomaly data
 # ─────────────────────────────────────────────────────────────────────────────
 
 _live_context_store: dict = {
     "spike_alerts": [],
     "contractor_flags": [],
     "state_sector_summary": {},
+    "_rendered": None,        # prompt-ready context string, or None if empty
+    "_anomaly_identity": None,  # which alerts are live, ignoring their numbers
+    "_version": 0,            # bumped whenever _anomaly_identity changes
 }
+_live_context_lock = threading.Lock()
+
+# Only the highest-spend contractor flags are sent to the LLM
+LIVE_CONTEXT_MAX_CONTRACTORS = 100
+
+
+def _csv(header: list[str], rows) -> str:
+    """Render rows as compact CSV — far fewer prompt tokens than JSON."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(header)
+    writer.writerows(rows)
+    return buf.getvalue().rstrip("\n")
+
+
+def _render_live_context() -> Optional[str]:
+    """
+    Serialize the live context once, compactly, for reuse by every query.
+    Only the fields the model reads are kept (no timestamps or derived
+    alert strings); floats are rounded to what the answer would cite.
+    """
+    context_parts = []
+
+    if _live_context_store["spike_alerts"]:
+        alerts_str = _csv(
+            ["state", "sector", "contractor", "allocation_cr", "spike_ratio"],
+            (
+                (s.get("state"), s.get("sector"), s.get("contractor"),
+                 round(s.get("allocation", 0)), round(s.get("spike_ratio", 0), 1))
+                for s in _live_context_store["spike_alerts"]
+            ),
+        )
+        context_parts.append(f"LIVE SPIKE ALERTS (recent):\n{alerts_str}")
+
+    if _live_context_store["contractor_flags"]:
+        flags_str = _csv(
+            ["contractor", "total_spend_cr", "payments"],
+            (
+                (c.get("contractor"), round(c.get("total_spend", 0)), c.get("payment_count"))
+                for c in _live_context_store["contractor_flags"]
+            ),
+        )
+        context_parts.append(f"LIVE CONTRACTOR FLAGS:\n{flags_str}")
+
+    if _live_context_store["state_sector_summary"]:
+        summary_str = _csv(
+            ["state", "sector", "total_cr", "events", "avg_cr"],
+            (
+                (*label.split(" / ", 1), round(v.get("total_allocation") or 0),
+                 v.get("event_count"), round(v.get("avg_allocation") or 0))
+                for label, v in _live_context_store["state_sector_summary"].items()
+            ),
+        )
+        context_parts.append(f"LIVE STATE-SECTOR TOTALS:\n{summary_str}")
+
+    return "\n\n".join(context_parts) if context_parts else None
+
+
+def _anomaly_identity(spike_alerts: list[dict], contractor_flags: list[dict]):
+    """
+    Which alerts are live, independent of their values: spike rows are
+    re-emitted whenever their sector average moves and contractor totals
+    grow with every payment, but neither makes an answer about them wrong.
+    """
+    return (
+        frozenset(
+            (s.get("state"), s.get("sector"), s.get("contractor"), s.get("timestamp"))
+            for s in spike_alerts
+        ),
+        frozenset(c.get("contractor") for c in contractor_flags),
+    )
 
 
 def update_live_context(
@@ -238,44 +789,222 @@ def update_live_context(
     in-memory context fresh.  This context is prepended to every LLM
     query so the model has the latest anomaly data.
     """
-    _live_context_store["spike_alerts"]       = spike_alerts[-10:]   # last 10
-    _live_context_store["contractor_flags"]   = contractor_flags
-    _live_context_store["state_sector_summary"] = state_sector_summary
+    with _live_context_lock:
+        _live_context_store["spike_alerts"]       = spike_alerts[-10:]   # last 10
+        _live_context_store["contractor_flags"]   = heapq.nlargest(
+            LIVE_CONTEXT_MAX_CONTRACTORS, contractor_flags,
+            key=lambda c: c.get("total_spend", 0),
+        )
+        _live_context_store["state_sector_summary"] = state_sector_summary
+
+        _live_context_store["_rendered"] = _render_live_context()
+        identity = _anomaly_identity(
+            _live_context_store["spike_alerts"], _live_context_store["contractor_flags"]
+        )
+        anomalies_changed = identity != _live_context_store["_anomaly_identity"]
+        _live_context_store["_anomaly_identity"] = identity
+        if anomalies_changed:
+            _live_context_store["_version"] += 1
+
+    # Running totals move with every event, so cached answers are only
+    # invalidated when the set of live alerts changes: exact-match keys
+    # carry the version, and the semantic cache is dropped.  Both caches'
+    # TTLs bound how stale the quoted numbers can get.
+    if anomalies_changed:
+        _semantic_cache.clear()
+
+
+# Questions mentioning any of these need the policy documents; anything
+# else (e.g. "summarize this week's budget changes") is answerable from
+# the live context alone, so embedding + vector search is skipped.
+_RETRIEVAL_KEYWORDS = re.compile(
+    r"\b(complian\w*|polic\w*|rules?|guidelines?|thresholds?|benchmarks?|"
+    r"watchlist|mandate|contractors?|approv\w*|disclos\w*|scrutiny|risk\w*|"
+    r"why|justif\w*|allowed|permitted|expected)\b",
+    re.IGNORECASE,
+)
+
+
+def _needs_retrieval(question: str) -> bool:
+    """Cheap keyword classifier — does this question need policy context?"""
+    return _RETRIEVAL_KEYWORDS.search(question) is not None
+
+
+async def _chat(prompt: str, max_tokens: int = LLM_MAX_TOKENS) -> str:
+    """Call the LLM directly with the auditor prompt — no retrieval."""
+    response = await _chat_client().chat.completions.create(
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        max_tokens=max_tokens,
+        messages=[
+            {"role": "system", "content": AUDITOR_SYSTEM_PROMPT},
+            {"role": "user",   "content": prompt},
+        ],
+    )
+    return response.choices[0].message.content or ""
+
+
+async def _open_chat_stream(prompt: str):
+    """
+    Like `_chat`, but return the completion as an open stream.  The
+    request is sent here, so connection and API errors surface to the
+    caller before anything has been streamed.
+    """
+    return await _chat_client().chat.completions.create(
+        model=LLM_MODEL,
+        temperature=LLM_TEMPERATURE,
+        max_tokens=LLM_MAX_TOKENS,
+        messages=[
+            {"role": "system", "content": AUDITOR_SYSTEM_PROMPT},
+            {"role": "user",   "content": prompt},
+        ],
+        stream=True,
+    )
+
+
+async def _retrieve_policy(question: str, k: int = RAG_RESPONSE_DOCS) -> list[str]:
+    """
+    Top-k policy chunks from the DocumentStore, via the answerer's REST
+    server — the same index (and runtime-reloaded documents) that
+    `query_budget_ai` retrieves from.
+    """
+    docs = await asyncio.to_thread(_rag_client.retrieve, question, k)
+    return [doc["text"] for doc in docs]
+
+
+def _answer_key(path: str, question: str) -> bytes:
+    """
+    Exact-match cache key: the user's question, not the enriched prompt
+    (which changes with every flush), plus the live-alert version.
+    """
+    return _LRUCache.key(f"{path}:{_live_context_store['_version']}:{question}")
+
+
+def _enrich(question: str) -> str:
+    """Prefix the question with the pre-rendered live-data context."""
+    # Live-data context is pre-rendered by update_live_context()
+    rendered = _live_context_store["_rendered"]
+    if not rendered:
+        return question
+    return (
+        "Use the following live real-time data as additional context:\n\n"
+        + rendered
+        + f"\n\n---\nQuestion: {question}"
+    )
+
+
+async def _cached_answer(question: str, path: str, key: bytes):
+    """
+    Look up the exact-match cache, then (RAG path only) the semantic cache.
+    Returns (answer or None, question embedding or None).
+    """
+    cached = _answer_cache.get(key)
+    if cached is not None or path != "rag":
+        return cached, None
+
+    # Paraphrase of a recently answered question (same anomaly data)?
+    try:
+        question_vector = await _embed_query(question)
+    except Exception:
+        return None, None
+    return _semantic_cache.get(question_vector), question_vector
+
 
+def _store_answer(path: str, key: bytes, question_vector, answer: str):
+    _answer_cache.put(key, answer)
+    if path == "rag" and question_vector is not None:
+        _semantic_cache.put(question_vector, answer)
 
-def query_budget_ai(
+
+async def query_budget_ai(
     question: str,
     answerer: Optional[BaseRAGQuestionAnswerer],
+    skip_retrieval: Optional[bool] = None,
 ) -> str:
     """
     Answer a natural-language question using RAG + live streaming context.
+
+    A coroutine, so concurrent FastAPI requests overlap their LLM calls
+    instead of queueing behind one another.  `skip_retrieval=None`
+    classifies the question; True/False forces the direct-LLM / RAG path.
     """
     if not XPACK_AVAILABLE or answerer is None:
         return "AI Auditor is currently unavailable (missing dependencies or key)."
 
-    # Build live-data context string to prepend to the question
-    context_parts = []
+    enriched_question = _enrich(question)
+
+    if skip_retrieval is None:
+        skip_retrieval = not _needs_retrieval(question)
+
+    # The two paths can answer differently, so they don't share entries
+    path = "direct" if skip_retrieval else "rag"
+    key = _answer_key(path, question)
+    cached, question_vector = await _cached_answer(question, path, key)
+    if cached is not None:
+        return cached
+
+    if skip_retrieval:
+        answer = await _chat(enriched_question)
+    else:
+        # Ask the Pathway RAG answerer (retrieves from the vector store +
+        # calls the LLM).  RAGClient is blocking, so keep it off the loop.
+        response = await asyncio.to_thread(_rag_client.answer, enriched_question)
+        answer = response["response"]
+    _store_answer(path, key, question_vector, answer)
+    return answer
 
-    if _live_context_store["spike_alerts"]:
-        alerts_str = json.dumps(_live_context_store["spike_alerts"], indent=2)
-        context_parts.append(f"LIVE SPIKE ALERTS (recent):\n{alerts_str}")
 
-    if _live_context_store["contractor_flags"]:
-        flags_str = json.dumps(_live_context_store["contractor_flags"], indent=2)
-        context_parts.append(f"LIVE CONTRACTOR FLAGS:\n{flags_str}")
+async def _once(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _stream_and_store(stream, path: str, key: bytes, question_vector) -> AsyncIterator[str]:
+    """Yield completion deltas, then cache the full answer."""
+    parts = []
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield parts[-1]
+    _store_answer(path, key, question_vector, "".join(parts))
 
-    if _live_context_store["state_sector_summary"]:
-        summary_str = json.dumps(_live_context_store["state_sector_summary"], indent=2)
-        context_parts.append(f"LIVE STATE-SECTOR TOTALS:\n{summary_str}")
 
-    enriched_question = question
-    if context_parts:
-        enriched_question = (
-            "Use the following live real-time data as additional context:\n\n"
-            + "\n\n".join(context_parts)
-            + f"\n\n---\nQuestion: {question}"
+async def query_budget_ai_stream(
+    question: str,
+    answerer: Optional[BaseRAGQuestionAnswerer],
+    skip_retrieval: Optional[bool] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming variant of `query_budget_ai`: resolves to an iterator that
+    yields the answer as the LLM generates it, so the first tokens reach
+    the caller in ~100 ms rather than after the full completion.
+
+    Cache lookup, retrieval and the LLM request all happen before this
+    coroutine returns, so their errors are raised here rather than
+    midway through a streamed response.  The RAG path retrieves from the
+    same DocumentStore as the answerer and streams only the LLM step.
+    Cache hits are yielded in one piece, and a completed stream populates
+    the same caches as `query_budget_ai`.
+    """
+    if not XPACK_AVAILABLE or answerer is None:
+        return _once("AI Auditor is currently unavailable (missing dependencies or key).")
+
+    if skip_retrieval is None:
+        skip_retrieval = not _needs_retrieval(question)
+
+    enriched_question = _enrich(question)
+    path = "direct" if skip_retrieval else "rag"
+    key = _answer_key(path, question)
+    cached, question_vector = await _cached_answer(question, path, key)
+    if cached is not None:
+        return _once(cached)
+
+    prompt = enriched_question
+    if not skip_retrieval:
+        docs = await _retrieve_policy(question)
+        prompt = (
+            "Relevant policy documents:\n\n" + "\n\n---\n".join(docs)
+            + f"\n\n---\n{enriched_question}"
         )
 
-    # Run the Pathway RAG answerer (retrieves from vector store + calls LLM)
-    answer = answerer.answer(enriched_question)
-    return answer
+    stream = await _open_chat_stream(prompt)
+    return _stream_and_store(stream, path, key, question_vector)
@@ -6,11 +6,11 @@ rows that change when a new event arrives.  There is zero batch
 re-scanning of historical data.
 
 Modules exported:
-  transform_budget(table)  → returns a dict of result tables:
+  transform_budget(table, contractor_names)  → returns a dict of result tables:
     {
       "state_sector_agg"  : rolling totals + event counts per (state, sector),
       "spike_alerts"      : events exceeding the dynamic spike threshold,
-      "contractor_flags"  : contractors with unusually high cumulative spend,
+      "contractor_flags"  : contractors with unusually high rolling 30-day spend,
     }
 """
 
@@ -26,8 +26,10 @@ import pathway as pw
 SPIKE_MULTIPLIER: float = 4.0
 
 # A contractor is flagged if their CUMULATIVE spend exceeds this threshold
-# (INR crores).
+# (INR crores) within a rolling window (policy: "any rolling 30-day window").
 CONTRACTOR_ALERT_CRORES: float = 5_000.0
+CONTRACTOR_WINDOW_SECONDS: int = 30 * 24 * 3600
+CONTRACTOR_WINDOW_HOP_SECONDS: int = 24 * 3600
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -75,17 +77,23 @@ def _spike_detection(
     Flag individual events whose allocation > SPIKE_MULTIPLIER × sector avg.
 
     Steps:
-      1. Compute sector-level (not state-level) average allocation.
+      1. Derive the sector-level (not state-level) average allocation
+         from the already-maintained (state, sector) aggregate.
       2. Join every raw event against the sector average.
       3. Filter rows where allocation is anomalously high.
     """
-    # Sector-level average (aggregate across all states for this sector)
+    # Sector-level average (aggregate across all states for this sector).
+    # Rolled up from state_sector_agg — at most |states| rows per sector —
+    # rather than re-scanning the raw event stream.
     sector_avg = (
-        table
-        .groupby(table.sector)
+        state_sector_agg
+        .groupby(state_sector_agg.sector)
         .reduce(
-            sector=pw.reducers.any(table.sector),
-            sector_avg=pw.reducers.sum(table.allocation) / pw.reducers.count(),
+            sector=pw.reducers.any(state_sector_agg.sector),
+            sector_avg=(
+                pw.reducers.sum(state_sector_agg.total_allocation)
+                / pw.reducers.sum(state_sector_agg.event_count)
+            ),
         )
     )
 
@@ -99,61 +107,82 @@ def _spike_detection(
         sector_avg=sector_avg.sector_avg,
     )
 
-    # Filter — only suspicious rows survive
+    # Filter — only suspicious rows survive.  The predicate is a native
+    # expression evaluated in the Rust engine over whole batches; routing it
+    # through a Python UDF would add per-row interpreter round-trips.
     spikes = joined.filter(
         joined.allocation > SPIKE_MULTIPLIER * joined.sector_avg
     )
 
-    spikes = spikes.select(
-        *pw.this,
-        spike_ratio=spikes.allocation / spikes.sector_avg,
-        alert_reason=pw.apply(
-            lambda state, sector, ratio: (
-                f"⚠ SPIKE: {state} / {sector} — "
-                f"{ratio:.1f}× above sector average"
-            ),
-            spikes.state, spikes.sector, spikes.allocation / spikes.sector_avg,
-        ),
-    )
+    # Alert text is formatted by the consumer (main.py) — only primitives
+    # flow through the graph
+    spikes = spikes.with_columns(spike_ratio=spikes.allocation / spikes.sector_avg)
     return spikes
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 3. Contractor anomaly flagging
-#    Running total per contractor; flag those exceeding threshold.
+#    Rolling 30-day spend per contractor; flag those exceeding threshold.
+#    Closed windows are dropped, so contractor state stays bounded.
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _contractor_anomalies(table: pw.Table) -> pw.Table:
+def _contractor_anomalies(table: pw.Table, contractor_names: pw.Table) -> pw.Table:
     """
-    Aggregate cumulative spend per contractor.
-    Flag contractors whose total spend exceeds CONTRACTOR_ALERT_CRORES.
+    Aggregate rolling 30-day spend per contractor.
+    Flag contractors whose windowed spend exceeds CONTRACTOR_ALERT_CRORES.
+
+    Windows, grouping and the self-join are keyed on the integer
+    contractor_id; names are joined back only for the flagged rows.
 
     Columns returned:
-      contractor, total_spend, payment_count, alert_reason
+      contractor, total_spend, payment_count
     """
-    contractor_agg = (
+    # Sliding windows (1-day hop); once a window has ended its state and
+    # result are forgotten (cutoff=0, keep_results=False).
+    windowed = (
         table
-        .groupby(table.contractor)
+        .windowby(
+            table.timestamp,
+            window=pw.temporal.sliding(
+                hop=CONTRACTOR_WINDOW_HOP_SECONDS,
+                duration=CONTRACTOR_WINDOW_SECONDS,
+            ),
+            instance=table.contractor_id,
+            behavior=pw.temporal.common_behavior(cutoff=0, keep_results=False),
+        )
         .reduce(
-            contractor=pw.reducers.any(table.contractor),
-            total_spend=pw.reducers.sum(table.allocation),
+            contractor_id=pw.this._pw_instance,
+            window_end=pw.this._pw_window_end,
+            total_spend=pw.reducers.sum(pw.this.allocation),
             payment_count=pw.reducers.count(),
         )
     )
 
+    # Of the still-open windows, the earliest-ending one spans the full
+    # trailing 30 days — that is the contractor's current rolling spend.
+    current = windowed.groupby(windowed.contractor_id).reduce(
+        contractor_id=pw.this.contractor_id,
+        window_end=pw.reducers.min(pw.this.window_end),
+    )
+    contractor_agg = windowed.join(
+        current,
+        windowed.contractor_id == current.contractor_id,
+        windowed.window_end == current.window_end,
+    ).select(
+        contractor_id=windowed.contractor_id,
+        total_spend=windowed.total_spend,
+        payment_count=windowed.payment_count,
+    )
+
     flagged = contractor_agg.filter(
         contractor_agg.total_spend > CONTRACTOR_ALERT_CRORES
     )
-
-    flagged = flagged.select(
-        *pw.this,
-        alert_reason=pw.apply(
-            lambda c, spend, count: (
-                f"🚨 CONTRACTOR FLAG: {c} — ₹{spend:,.0f} Cr "
-                f"across {count} payments"
-            ),
-            flagged.contractor, flagged.total_spend, flagged.payment_count,
-        ),
+    flagged = flagged.join(
+        contractor_names, flagged.contractor_id == contractor_names.contractor_id
+    ).select(
+        contractor=contractor_names.contractor,
+        total_spend=flagged.total_spend,
+        payment_count=flagged.payment_count,
     )
     return flagged
 
@@ -162,7 +191,7 @@ def _contractor_anomalies(table: pw.Table) -> pw.Table:
 # 4. Public API
 # ─────────────────────────────────────────────────────────────────────────────
 
-def transform_budget(table: pw.Table) -> dict[str, pw.Table]:
+def transform_budget(table: pw.Table, contractor_names: pw.Table) -> dict[str, pw.Table]:
     """
     Run all streaming transformations on the raw budget event table.
 
@@ -170,6 +199,8 @@ def transform_budget(table: pw.Table) -> dict[str, pw.Table]:
     ----------
     table : pw.Table
         The live streaming table from ingestion.get_budget_stream().
+    contractor_names : pw.Table
+        The contractor id → name table from ingestion.get_contractor_names().
 
     Returns
     -------
@@ -180,7 +211,7 @@ def transform_budget(table: pw.Table) -> dict[str, pw.Table]:
     """
     state_sector_agg = _state_sector_aggregations(table)
     spike_alerts     = _spike_detection(table, state_sector_agg)
-    contractor_flags = _contractor_anomalies(table)
+    contractor_flags = _contractor_anomalies(table, contractor_names)
 
     return {
         "state_sector_agg": state_sector_agg,